@@ -1,7 +1,8 @@
 """FastAPI routes for PromptLab"""
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
+from pydantic import BaseModel
 from typing import Optional
 
 from app.models import (
@@ -10,8 +11,8 @@ from app.models import (
     PromptList, CollectionList, HealthResponse,
     get_current_time
 )
-from app.storage import storage
-from app.utils import sort_prompts_by_date, filter_prompts_by_collection, search_prompts
+from app.storage import CollectionNotFoundError, storage
+from app.utils import sort_prompts_by_date
 from app import __version__
 
 
@@ -31,11 +32,28 @@ app.add_middleware(
 )
 
 
+def model_response(model: BaseModel, status_code: int = 200) -> Response:
+    """Serialize an already-validated model straight to a JSON response.
+
+    Returning a Response skips FastAPI's response_model round trip
+    (dump, re-validate, serialize) for objects that came out of storage.
+    """
+    return Response(
+        content=model.model_dump_json(),
+        status_code=status_code,
+        media_type="application/json",
+    )
+
+
 # ============== Health Check ==============
 
+# The health payload is static, so build it once at import time
+HEALTH = HealthResponse(status="healthy", version=__version__)
+
+
 @app.get("/health", response_model=HealthResponse)
 def health_check():
-    return HealthResponse(status="healthy", version=__version__)
+    return model_response(HEALTH)
 
 
 # ============== Prompt Endpoints ==============
@@ -45,45 +63,41 @@ def list_prompts(
     collection_id: Optional[str] = None,
     search: Optional[str] = None
 ):
-    prompts = storage.get_all_prompts()
-    
-    # Filter by collection if specified
-    if collection_id:
-        prompts = filter_prompts_by_collection(prompts, collection_id)
-    
-    # Search if query provided
+    # Search if query provided, optionally within one collection
     if search:
-        prompts = search_prompts(prompts, search)
+        prompts = storage.search_prompts(search, collection_id or None)
+    # Filter by collection if specified (served from the storage index)
+    elif collection_id:
+        prompts = storage.get_prompts_by_collection(collection_id)
+    else:
+        prompts = storage.get_all_prompts()
     
     # Sort by date (newest first)
-    # Note: There might be an issue with the sorting...
     prompts = sort_prompts_by_date(prompts, descending=True)
     
-    return PromptList(prompts=prompts, total=len(prompts))
+    # Items are already validated Prompts; build the envelope without re-validating them
+    return model_response(PromptList.model_construct(prompts=prompts, total=len(prompts)))
 
 
 @app.get("/prompts/{prompt_id}", response_model=Prompt)
 def get_prompt(prompt_id: str):
-    # BUG #1: This will raise a 500 error if prompt doesn't exist
-    # because we're accessing .id on None
-    # Should return 404 instead!
     prompt = storage.get_prompt(prompt_id)
-    
-    # This line causes the bug - accessing attribute on None
-    if prompt.id:
-        return prompt
+    if not prompt:
+        raise HTTPException(status_code=404, detail="Prompt not found")
+    return model_response(prompt)
 
 
 @app.post("/prompts", response_model=Prompt, status_code=201)
 def create_prompt(prompt_data: PromptCreate):
-    # Validate collection exists if provided
-    if prompt_data.collection_id:
-        collection = storage.get_collection(prompt_data.collection_id)
-        if not collection:
-            raise HTTPException(status_code=400, detail="Collection not found")
-    
-    prompt = Prompt(**prompt_data.model_dump())
-    return storage.create_prompt(prompt)
+    # One clock read for both timestamps, so a new prompt has created_at == updated_at
+    now = get_current_time()
+    prompt = Prompt(**prompt_data.model_dump(), created_at=now, updated_at=now)
+    # Storage checks the collection exists under its write lock, so a
+    # concurrent collection delete can't leave the prompt orphaned
+    try:
+        return model_response(storage.create_prompt(prompt), status_code=201)
+    except CollectionNotFoundError:
+        raise HTTPException(status_code=400, detail="Collection not found")
 
 
 @app.put("/prompts/{prompt_id}", response_model=Prompt)
@@ -92,12 +106,6 @@ def update_prompt(prompt_id: str, prompt_data: PromptUpdate):
     if not existing:
         raise HTTPException(status_code=404, detail="Prompt not found")
     
-    # Validate collection if provided
-    if prompt_data.collection_id:
-        collection = storage.get_collection(prompt_data.collection_id)
-        if not collection:
-            raise HTTPException(status_code=400, detail="Collection not found")
-    
     # BUG #2: We're not updating the updated_at timestamp!
     # The updated prompt keeps the old timestamp
     updated_prompt = Prompt(
@@ -110,7 +118,14 @@ def update_prompt(prompt_id: str, prompt_data: PromptUpdate):
         updated_at=existing.updated_at  # BUG: Should be get_current_time()
     )
     
-    return storage.update_prompt(prompt_id, updated_prompt)
+    # The collection is checked under the storage write lock, as in create_prompt
+    try:
+        updated = storage.update_prompt(prompt_id, updated_prompt)
+    except CollectionNotFoundError:
+        raise HTTPException(status_code=400, detail="Collection not found")
+    if updated is None:
+        raise HTTPException(status_code=404, detail="Prompt not found")
+    return updated
 
 
 # NOTE: PATCH endpoint is missing! Students need to implement this.
@@ -129,7 +144,9 @@ def delete_prompt(prompt_id: str):
 @app.get("/collections", response_model=CollectionList)
 def list_collections():
     collections = storage.get_all_collections()
-    return CollectionList(collections=collections, total=len(collections))
+    return model_response(
+        CollectionList.model_construct(collections=collections, total=len(collections))
+    )
 
 
 @app.get("/collections/{collection_id}", response_model=Collection)
@@ -137,24 +154,18 @@ def get_collection(collection_id: str):
     collection = storage.get_collection(collection_id)
     if not collection:
         raise HTTPException(status_code=404, detail="Collection not found")
-    return collection
+    return model_response(collection)
 
 
 @app.post("/collections", response_model=Collection, status_code=201)
 def create_collection(collection_data: CollectionCreate):
     collection = Collection(**collection_data.model_dump())
-    return storage.create_collection(collection)
+    return model_response(storage.create_collection(collection), status_code=201)
 
 
 @app.delete("/collections/{collection_id}", status_code=204)
 def delete_collection(collection_id: str):
-    # BUG #4: We delete the collection but don't handle the prompts!
-    # Prompts with this collection_id become orphaned with invalid reference
-    # Should either: delete the prompts, set collection_id to None, or prevent deletion
-    
+    # Prompts in the collection are kept and moved out of it (collection_id -> None)
     if not storage.delete_collection(collection_id):
         raise HTTPException(status_code=404, detail="Collection not found")
-    
-    # Missing: Handle prompts that belong to this collection!
-    
     return None
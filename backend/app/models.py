@@ -1,8 +1,8 @@
 """Pydantic models for PromptLab"""
 
 from datetime import datetime
-from typing import Optional, List
-from pydantic import BaseModel, Field
+from typing import Annotated, Optional, List
+from pydantic import BaseModel, Field, StringConstraints
 from uuid import uuid4
 
 
@@ -14,12 +14,18 @@ def get_current_time() -> datetime:
     return datetime.utcnow()
 
 
+# ============== Constrained Types ==============
+# Prompts and collections share the description limit, so it's declared once.
+
+Description = Annotated[str, StringConstraints(max_length=500)]
+
+
 # ============== Prompt Models ==============
 
 class PromptBase(BaseModel):
     title: str = Field(..., min_length=1, max_length=200)
     content: str = Field(..., min_length=1)
-    description: Optional[str] = Field(None, max_length=500)
+    description: Optional[Description] = None
     collection_id: Optional[str] = None
 
 
@@ -44,7 +50,7 @@ class Prompt(PromptBase):
 
 class CollectionBase(BaseModel):
     name: str = Field(..., min_length=1, max_length=100)
-    description: Optional[str] = Field(None, max_length=500)
+    description: Optional[Description] = None
 
 
 class CollectionCreate(CollectionBase):
@@ -4,65 +4,241 @@ This module provides simple in-memory storage for prompts and collections.
 In a production environment, this would be replaced with a database.
 """
 
-from typing import Dict, List, Optional
+import threading
+from typing import Dict, List, Optional, Set, Tuple
 from app.models import Prompt, Collection
 
 
+class CollectionNotFoundError(LookupError):
+    """A prompt write referenced a collection that doesn't exist."""
+
+
 class Storage:
     def __init__(self):
         self._prompts: Dict[str, Prompt] = {}
         self._collections: Dict[str, Collection] = {}
+        # Secondary index: collection_id -> ids of the prompts filed under it.
+        # Inner dicts are used as insertion-ordered sets so results keep
+        # creation order. Prompts without a collection aren't indexed.
+        self._by_collection: Dict[str, Dict[str, None]] = {}
+        # prompt_id -> (lowercased "title\0description", prompt), so searches
+        # don't re-lowercase every prompt and need a single 'in' per candidate.
+        # Text and prompt are stored together so one lookup sees a matching pair.
+        self._search_entries: Dict[str, Tuple[str, Prompt]] = {}
+        # Inverted index: 3-character window of search text -> prompt ids.
+        # Any substring match of 3+ characters contains all of the query's
+        # trigrams, so intersecting their postings yields the candidates.
+        self._trigram_index: Dict[str, Set[str]] = {}
+        # Cached get_all_* results, rebuilt lazily after a write
+        self._prompts_snapshot: Optional[List[Prompt]] = None
+        self._collections_snapshot: Optional[List[Collection]] = None
+        # Writers update the tables, indexes and snapshots together under the
+        # lock. Readers never take it: they iterate only tuple() copies of the
+        # live containers and otherwise use single get/in lookups. The one
+        # exception is rebuilding a get_all_* snapshot after a write.
+        self._write_lock = threading.Lock()
+    
+    # ============== Index Maintenance ==============
+    
+    def _index_prompt(self, prompt_id: str, collection_id: Optional[str]) -> None:
+        if not collection_id:
+            return
+        self._by_collection.setdefault(collection_id, {})[prompt_id] = None
+    
+    def _unindex_prompt(self, prompt_id: str, collection_id: Optional[str]) -> None:
+        prompt_ids = self._by_collection.get(collection_id)
+        if prompt_ids is not None:
+            prompt_ids.pop(prompt_id, None)
+            if not prompt_ids:
+                del self._by_collection[collection_id]
+    
+    @staticmethod
+    def _trigrams(text: str) -> Set[str]:
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+    
+    def _index_search_text(self, prompt_id: str, prompt: Prompt) -> None:
+        self._unindex_search_text(prompt_id)
+        # Joined with NUL so ordinary queries never match across the two fields
+        text = f"{prompt.title}\0{prompt.description or ''}".lower()
+        self._search_entries[prompt_id] = (text, prompt)
+        for gram in self._trigrams(text):
+            self._trigram_index.setdefault(gram, set()).add(prompt_id)
+    
+    def _unindex_search_text(self, prompt_id: str) -> None:
+        entry = self._search_entries.pop(prompt_id, None)
+        if entry is None:
+            return
+        text = entry[0]
+        for gram in self._trigrams(text):
+            prompt_ids = self._trigram_index[gram]
+            prompt_ids.discard(prompt_id)
+            if not prompt_ids:
+                del self._trigram_index[gram]
     
     # ============== Prompt Operations ==============
     
+    def _check_collection(self, prompt: Prompt) -> None:
+        # Called under the write lock, so the collection can't be deleted
+        # between this check and the prompt being filed under it
+        collection_id = prompt.collection_id
+        if not collection_id:
+            return
+        collection = self._collections.get(collection_id)
+        if collection is None:
+            raise CollectionNotFoundError(collection_id)
+        # Share the collection's own id string rather than keeping a copy per prompt
+        prompt.collection_id = collection.id
+    
     def create_prompt(self, prompt: Prompt) -> Prompt:
-        self._prompts[prompt.id] = prompt
+        """Store a prompt; raises CollectionNotFoundError for an unknown collection."""
+        with self._write_lock:
+            self._check_collection(prompt)
+            existing = self._prompts.get(prompt.id)
+            if existing is not None:
+                self._unindex_prompt(prompt.id, existing.collection_id)
+            self._prompts[prompt.id] = prompt
+            self._index_prompt(prompt.id, prompt.collection_id)
+            self._index_search_text(prompt.id, prompt)
+            self._prompts_snapshot = None
         return prompt
     
     def get_prompt(self, prompt_id: str) -> Optional[Prompt]:
         return self._prompts.get(prompt_id)
     
     def get_all_prompts(self) -> List[Prompt]:
-        return list(self._prompts.values())
+        """Return all prompts.
+        
+        The list is cached until the next prompt write and shared between
+        callers, so treat it as read-only.
+        """
+        snapshot = self._prompts_snapshot
+        if snapshot is None:
+            # Rebuild under the lock so a concurrent write can't be overwritten
+            # by a stale list
+            with self._write_lock:
+                if self._prompts_snapshot is None:
+                    self._prompts_snapshot = list(self._prompts.values())
+                snapshot = self._prompts_snapshot
+        return snapshot
     
     def update_prompt(self, prompt_id: str, prompt: Prompt) -> Optional[Prompt]:
-        if prompt_id not in self._prompts:
-            return None
-        self._prompts[prompt_id] = prompt
+        """Replace a prompt, or return None if it doesn't exist.
+        
+        Raises CollectionNotFoundError for an unknown collection.
+        """
+        with self._write_lock:
+            existing = self._prompts.get(prompt_id)
+            if existing is None:
+                return None
+            self._check_collection(prompt)
+            self._prompts[prompt_id] = prompt
+            self._index_search_text(prompt_id, prompt)
+            self._prompts_snapshot = None
+            if existing.collection_id != prompt.collection_id:
+                self._unindex_prompt(prompt_id, existing.collection_id)
+                self._index_prompt(prompt_id, prompt.collection_id)
         return prompt
     
     def delete_prompt(self, prompt_id: str) -> bool:
-        if prompt_id in self._prompts:
-            del self._prompts[prompt_id]
-            return True
-        return False
+        with self._write_lock:
+            prompt = self._prompts.pop(prompt_id, None)
+            if prompt is None:
+                return False
+            self._unindex_prompt(prompt_id, prompt.collection_id)
+            self._unindex_search_text(prompt_id)
+            self._prompts_snapshot = None
+        return True
+    
+    def search_prompts(self, query: str, collection_id: Optional[str] = None) -> List[Prompt]:
+        """Case-insensitive substring search over prompt titles and descriptions.
+        
+        Same matching rules as utils.search_prompts. Queries of 3+ characters
+        only check the prompts sharing all of the query's trigrams; shorter
+        queries check every candidate. Pass collection_id to search one
+        collection.
+        """
+        # An empty query is a substring of everything
+        if not query:
+            if collection_id is None:
+                return list(self.get_all_prompts())
+            return self.get_prompts_by_collection(collection_id)
+        query_lower = query.lower()
+        grams = self._trigrams(query_lower)
+        if grams:
+            postings = [self._trigram_index.get(gram) for gram in grams]
+            if None in postings:
+                return []
+            postings.sort(key=len)
+            smallest, rest = postings[0], postings[1:]
+            if collection_id is not None:
+                rest.append(self._by_collection.get(collection_id, ()))
+            # Walk a copy of the smallest posting; the others only see 'in' checks
+            candidate_ids = [
+                pid for pid in tuple(smallest)
+                if all(pid in posting for posting in rest)
+            ]
+            entries = map(self._search_entries.get, candidate_ids)
+        elif collection_id is None:
+            entries = tuple(self._search_entries.values())
+        else:
+            entries = map(
+                self._search_entries.get,
+                tuple(self._by_collection.get(collection_id, ()))
+            )
+        
+        # Verify the substring on the (small) candidate set
+        return [
+            entry[1] for entry in entries
+            if entry is not None and query_lower in entry[0]
+        ]
     
     # ============== Collection Operations ==============
     
     def create_collection(self, collection: Collection) -> Collection:
-        self._collections[collection.id] = collection
+        with self._write_lock:
+            self._collections[collection.id] = collection
+            self._collections_snapshot = None
         return collection
     
     def get_collection(self, collection_id: str) -> Optional[Collection]:
         return self._collections.get(collection_id)
     
     def get_all_collections(self) -> List[Collection]:
-        return list(self._collections.values())
+        """Return all collections (cached and shared, like get_all_prompts)."""
+        snapshot = self._collections_snapshot
+        if snapshot is None:
+            with self._write_lock:
+                if self._collections_snapshot is None:
+                    self._collections_snapshot = list(self._collections.values())
+                snapshot = self._collections_snapshot
+        return snapshot
     
     def delete_collection(self, collection_id: str) -> bool:
-        if collection_id in self._collections:
-            del self._collections[collection_id]
-            return True
-        return False
+        """Delete a collection and detach its prompts (collection_id -> None)."""
+        with self._write_lock:
+            if self._collections.pop(collection_id, None) is None:
+                return False
+            self._collections_snapshot = None
+            # Only the prompts filed under this collection are touched
+            for pid in self._by_collection.pop(collection_id, ()):
+                self._prompts[pid].collection_id = None
+        return True
     
     def get_prompts_by_collection(self, collection_id: str) -> List[Prompt]:
-        return [p for p in self._prompts.values() if p.collection_id == collection_id]
+        prompt_ids = tuple(self._by_collection.get(collection_id, ()))
+        return [p for p in map(self._prompts.get, prompt_ids) if p is not None]
     
     # ============== Utility ==============
     
     def clear(self):
-        self._prompts.clear()
-        self._collections.clear()
+        with self._write_lock:
+            self._prompts.clear()
+            self._collections.clear()
+            self._by_collection.clear()
+            self._search_entries.clear()
+            self._trigram_index.clear()
+            self._prompts_snapshot = None
+            self._collections_snapshot = None
 
 
 # Global storage instance
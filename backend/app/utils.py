@@ -1,17 +1,21 @@
 """Utility functions for PromptLab"""
 
+import re
+from operator import attrgetter
 from typing import List
 from app.models import Prompt
 
 
+# Template variables look like {{variable_name}}
+VARIABLE_PATTERN = re.compile(r'\{\{(\w+)\}\}')
+
+# C-level sort key, avoids a Python lambda call per element
+_created_at = attrgetter("created_at")
+
+
 def sort_prompts_by_date(prompts: List[Prompt], descending: bool = True) -> List[Prompt]:
-    """Sort prompts by creation date.
-    
-    Note: There might be a bug here. Check the sort order!
-    """
-    # BUG #3: This sorts ascending (oldest first) when it should sort descending (newest first)
-    # The 'descending' parameter is ignored!
-    return sorted(prompts, key=lambda p: p.created_at)
+    """Sort prompts by creation date (newest first unless descending=False)."""
+    return sorted(prompts, key=_created_at, reverse=descending)
 
 
 def filter_prompts_by_collection(prompts: List[Prompt], collection_id: str) -> List[Prompt]:
@@ -19,6 +23,9 @@ def filter_prompts_by_collection(prompts: List[Prompt], collection_id: str) -> L
 
 
 def search_prompts(prompts: List[Prompt], query: str) -> List[Prompt]:
+    # An empty query is a substring of everything
+    if not query:
+        return list(prompts)
     query_lower = query.lower()
     return [
         p for p in prompts 
@@ -35,7 +42,7 @@ def validate_prompt_content(content: str) -> bool:
     - Not be just whitespace
     - Be at least 10 characters
     """
-    if not content or not content.strip():
+    if not content:
         return False
     return len(content.strip()) >= 10
 
@@ -45,6 +52,4 @@ def extract_variables(content: str) -> List[str]:
     
     Variables are in the format {{variable_name}}
     """
-    import re
-    pattern = r'\{\{(\w+)\}\}'
-    return re.findall(pattern, content)
+    return VARIABLE_PATTERN.findall(content)
@@ -1,10 +1,20 @@
 """PromptLab API Server
 
 Run with: python main.py
+Set DEV=1 to enable auto-reload while developing.
 """
 
+import os
+
 import uvicorn
-from app.api import app
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
+    # Single worker: storage is in-memory, so each worker process would hold
+    # its own copy of the data. Loop and HTTP parser default to "auto", which
+    # picks uvloop and httptools when installed (uvicorn[standard]).
+    uvicorn.run(
+        "app.api:app",
+        host="0.0.0.0",
+        port=8000,
+        reload=os.getenv("DEV") == "1",
+    )
@@ -6,10 +6,14 @@ from app.api import app
 from app.storage import storage
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def client():
-    """Create a test client for the API."""
-    return TestClient(app)
+    """Create one test client for the API, shared by the whole session.
+    
+    State isolation comes from clear_storage, not from a fresh client.
+    """
+    with TestClient(app) as c:
+        yield c
 
 
 @pytest.fixture(autouse=True)
@@ -4,9 +4,14 @@ These tests verify the API endpoints work correctly.
 Students should expand these tests significantly in Week 3.
 """
 
+import asyncio
+
+import httpx
 import pytest
 from fastapi.testclient import TestClient
 
+from app.api import app
+
 
 class TestHealth:
     """Tests for health endpoint."""
@@ -30,6 +35,7 @@ class TestPrompts:
         assert data["content"] == sample_prompt_data["content"]
         assert "id" in data
         assert "created_at" in data
+        assert data["updated_at"] == data["created_at"]
     
     def test_list_prompts_empty(self, client: TestClient):
         response = client.get("/prompts")
@@ -47,6 +53,29 @@ class TestPrompts:
         data = response.json()
         assert len(data["prompts"]) == 1
         assert data["total"] == 1
+        
+        # A later write is reflected in the next listing
+        client.post("/prompts", json=sample_prompt_data)
+        assert client.get("/prompts").json()["total"] == 2
+    
+    def test_create_prompts_concurrently(self, client: TestClient, sample_prompt_data):
+        """Concurrent creates all land in storage and its indexes."""
+        num_prompts = 20
+        
+        async def create_all():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+                return await asyncio.gather(*[
+                    ac.post("/prompts", json={**sample_prompt_data, "title": f"Prompt {i}"})
+                    for i in range(num_prompts)
+                ])
+        
+        responses = asyncio.run(create_all())
+        assert all(r.status_code == 201 for r in responses)
+        assert len({r.json()["id"] for r in responses}) == num_prompts
+        
+        assert client.get("/prompts").json()["total"] == num_prompts
+        assert client.get("/prompts", params={"search": "prompt 1"}).json()["total"] == 11
     
     def test_get_prompt_success(self, client: TestClient, sample_prompt_data):
         # Create a prompt first
@@ -56,17 +85,12 @@ class TestPrompts:
         response = client.get(f"/prompts/{prompt_id}")
         assert response.status_code == 200
         data = response.json()
-        assert data["id"] == prompt_id
+        assert data == create_response.json()
     
     def test_get_prompt_not_found(self, client: TestClient):
-        """Test that getting a non-existent prompt returns 404.
-        
-        NOTE: This test currently FAILS due to Bug #1!
-        The API returns 500 instead of 404.
-        """
+        """Test that getting a non-existent prompt returns 404."""
         response = client.get("/prompts/nonexistent-id")
-        # This should be 404, but there's a bug...
-        assert response.status_code == 404  # Will fail until bug is fixed
+        assert response.status_code == 404
     
     def test_delete_prompt(self, client: TestClient, sample_prompt_data):
         # Create a prompt first
@@ -79,8 +103,7 @@ class TestPrompts:
         
         # Verify it's gone
         get_response = client.get(f"/prompts/{prompt_id}")
-        # Note: This might fail due to Bug #1
-        assert get_response.status_code in [404, 500]  # 404 after fix
+        assert get_response.status_code == 404
     
     def test_update_prompt(self, client: TestClient, sample_prompt_data):
         # Create a prompt first
@@ -107,11 +130,54 @@ class TestPrompts:
         # The updated_at should be different from original
         # assert data["updated_at"] != original_updated_at  # Uncomment after fix
     
-    def test_sorting_order(self, client: TestClient):
-        """Test that prompts are sorted newest first.
+    def test_list_prompts_by_collection(self, client: TestClient, sample_prompt_data, sample_collection_data):
+        col1 = client.post("/collections", json=sample_collection_data).json()["id"]
+        col2 = client.post("/collections", json=sample_collection_data).json()["id"]
         
-        NOTE: This test might fail due to Bug #3!
-        """
+        prompt_id = client.post("/prompts", json={**sample_prompt_data, "collection_id": col1}).json()["id"]
+        client.post("/prompts", json=sample_prompt_data)
+        
+        prompts = client.get("/prompts", params={"collection_id": col1}).json()["prompts"]
+        assert [p["id"] for p in prompts] == [prompt_id]
+        
+        # Moving the prompt updates the collection filter
+        client.put(f"/prompts/{prompt_id}", json={**sample_prompt_data, "collection_id": col2})
+        assert client.get("/prompts", params={"collection_id": col1}).json()["total"] == 0
+        prompts = client.get("/prompts", params={"collection_id": col2}).json()["prompts"]
+        assert [p["id"] for p in prompts] == [prompt_id]
+        
+        # Deleted prompts drop out of the filter
+        client.delete(f"/prompts/{prompt_id}")
+        assert client.get("/prompts", params={"collection_id": col2}).json()["total"] == 0
+    
+    def test_search_prompts(self, client: TestClient, sample_prompt_data, sample_collection_data):
+        collection_id = client.post("/collections", json=sample_collection_data).json()["id"]
+        review_id = client.post("/prompts", json=sample_prompt_data).json()["id"]
+        client.post("/prompts", json={"title": "Summarizer", "content": "Summarize {{text}}"})
+        
+        def search(query, **params):
+            response = client.get("/prompts", params={"search": query, **params})
+            return [p["id"] for p in response.json()["prompts"]]
+        
+        # Case-insensitive match on title or description
+        assert search("CODE REVIEW") == [review_id]
+        assert search("ai code") == [review_id]
+        assert search("nothing like this") == []
+        # Queries shorter than a trigram still match
+        assert search("ai") == [review_id]
+        
+        # Updates are reflected, and search can be scoped to a collection
+        client.put(f"/prompts/{review_id}", json={**sample_prompt_data, "title": "Linter", "collection_id": collection_id})
+        assert search("linter") == [review_id]
+        assert search("linter", collection_id=collection_id) == [review_id]
+        assert search("summarizer", collection_id=collection_id) == []
+        
+        # Deleted prompts are no longer found
+        client.delete(f"/prompts/{review_id}")
+        assert search("linter") == []
+    
+    def test_sorting_order(self, client: TestClient):
+        """Test that prompts are sorted newest first."""
         import time
         
         # Create prompts with delay
@@ -126,7 +192,7 @@ class TestPrompts:
         prompts = response.json()["prompts"]
         
         # Newest (Second) should be first
-        assert prompts[0]["title"] == "Second"  # Will fail until Bug #3 fixed
+        assert [p["title"] for p in prompts] == ["Second", "First"]
 
 
 class TestCollections:
@@ -151,12 +217,21 @@ class TestCollections:
         response = client.get("/collections/nonexistent-id")
         assert response.status_code == 404
     
+    def test_prompt_in_deleted_collection_rejected(self, client: TestClient, sample_collection_data, sample_prompt_data):
+        """Creating or moving a prompt into a deleted collection returns 400."""
+        collection_id = client.post("/collections", json=sample_collection_data).json()["id"]
+        prompt_id = client.post("/prompts", json=sample_prompt_data).json()["id"]
+        client.delete(f"/collections/{collection_id}")
+        
+        prompt_data = {**sample_prompt_data, "collection_id": collection_id}
+        assert client.post("/prompts", json=prompt_data).status_code == 400
+        assert client.put(f"/prompts/{prompt_id}", json=prompt_data).status_code == 400
+        assert client.get(f"/prompts/{prompt_id}").json()["collection_id"] is None
+    
     def test_delete_collection_with_prompts(self, client: TestClient, sample_collection_data, sample_prompt_data):
         """Test deleting a collection that has prompts.
         
-        NOTE: Bug #4 - prompts become orphaned after collection deletion.
-        This test documents the current (buggy) behavior.
-        After fixing, update the test to verify correct behavior.
+        The prompts are kept and detached from the deleted collection.
         """
         # Create collection
         col_response = client.post("/collections", json=sample_collection_data)
@@ -168,12 +243,10 @@ class TestCollections:
         prompt_id = prompt_response.json()["id"]
         
         # Delete collection
-        client.delete(f"/collections/{collection_id}")
+        response = client.delete(f"/collections/{collection_id}")
+        assert response.status_code == 204
         
-        # The prompt still exists but has invalid collection_id
-        # This is Bug #4 - should be handled properly
-        prompts = client.get("/prompts").json()["prompts"]
-        if prompts:
-            # Prompt exists with orphaned collection_id
-            assert prompts[0]["collection_id"] == collection_id
-            # After fix, collection_id should be None or prompt should be deleted
+        # The prompt still exists but no longer references the collection
+        prompt = client.get(f"/prompts/{prompt_id}").json()
+        assert prompt["collection_id"] is None
+        assert client.get("/prompts", params={"collection_id": collection_id}).json()["total"] == 0